@@ -10,13 +10,21 @@ OTHER_TEMP_THRESHOLD = 80
 # SERVER_DOWN_TIME = 60 * 5 - 1  # 5 minutes
 SERVER_DOWN_TIME = 0  # 5 minutes
 
+# Hard limit (seconds) on a single probe command, local or over SSH
+COMMAND_TIMEOUT = 10
+
+# Keep last_uptime/down_since in JSON files between runs (needed when the
+# monitor is started by a timer); False keeps them in memory only
+PERSIST_STATE = True
+
 
 CURRENT_SERVER_NAME = "rtx_sashimi"
 # server list
 # Adjust addresses/names as needed
+# Set "gpu": False on servers without NVIDIA GPUs to skip the nvidia-smi probes
 SERVERS = [
     {"name": "rtx_sashimi", "address": "rtx_sashimi"}, # Current server
     {"name": "fatchoy", "address": "fatchoy"},
     {"name": "hakao",   "address": "hakao"},
-    {"name": "rtx_dimsum",  "address": "rtx_dimsum"},  # CPU server
+    {"name": "rtx_dimsum",  "address": "rtx_dimsum", "gpu": False},  # CPU server
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
-from master_monitor import send_discord_alert
+from master_monitor import send_discord_alert, flush_alerts
 
 message = "[2025-03-13 14:52:05] :white_check_mark: rtx_dimsum is back up after 722 seconds!"
-send_discord_alert(message)
\ No newline at end of file
+send_discord_alert(message)
+flush_alerts()
\ No newline at end of file
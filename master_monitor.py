@@ -1,25 +1,53 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
 import os
+import functools
+import atexit
 import time
-import requests
-import paramiko
+import glob
+import shlex
+import re
 import subprocess
 from dotenv import load_dotenv
 from datetime import datetime, timezone, timedelta
 import json 
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
 import config
+from ssh_utils import is_reachable, run_ssh_command, run_ssh_commands
+
+if TYPE_CHECKING:
+    import requests
 
 load_dotenv()
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
 
-# If using password-based SSH instead of a key, set config.SSH_KEY_PATH = None in config.py.
-# SSH_PASSWORD = None  # e.g. "your-ssh-password" if not using key-based auth
+# Loaded on the first flush_alerts() that has something to send
+@functools.lru_cache(maxsize=None)
+def _requests():
+    import requests
+    return requests
 
 # Track uptime to detect unexpected reboots
 last_uptime = {}
 # Track when a server was first detected down
 down_since = {}
+# Alert timestamps are in Hong Kong time (UTC+8)
+_HK_TZ = timezone(timedelta(hours=8))
+# Alerts queued during a monitor() cycle, sent together by flush_alerts()
+_ALERT_BUF: list[str] = []
+# Discord caps message content at 2000 characters
+ALERT_CHUNK_SIZE = 1900
+
+@functools.lru_cache(maxsize=None)
+def _session() -> requests.Session:
+    """Keep-alive HTTP session so alerts reuse one connection to Discord."""
+    from requests.adapters import HTTPAdapter
+    session = _requests().Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    return session
 
 LAST_UPTIME_FILE = "last_uptime.json"
 DOWN_SINCE_FILE = "down_since.json"
@@ -34,11 +62,22 @@ def load_last_uptime():
             return {}
     return {}
 
+def _write_json_atomic(path: str, data):
+    """
+    Write data as JSON to a temporary file, then move it over `path`
+    so a crash mid-write never leaves a truncated file behind.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 def save_last_uptime(data):
     """Save last uptime values to a JSON file."""
     try:
-        with open(LAST_UPTIME_FILE, "w") as f:
-            json.dump(data, f)
+        _write_json_atomic(LAST_UPTIME_FILE, data)
     except Exception as e:
         print(f"[Error] Failed to save last uptime data: {e}")
 
@@ -55,96 +94,224 @@ def load_down_since():
 def save_down_since(data):
     """Save down_since values to a JSON file."""
     try:
-        with open(DOWN_SINCE_FILE, "w") as f:
-            json.dump(data, f)
+        _write_json_atomic(DOWN_SINCE_FILE, data)
     except Exception as e:
         print(f"[Error] Failed to save down_since data: {e}")
         
 def send_discord_alert(message: str):
     """
-    Send an alert to Discord, prefixing the message with
+    Queue an alert for Discord, prefixing the message with
     a timestamp in Hong Kong time (UTC+8).
+    Queued alerts are sent together by flush_alerts().
     """
     if not DISCORD_WEBHOOK_URL:
         print("[Warning] DISCORD_WEBHOOK_URL not set. Skipping alert.")
         return
 
-    # Get Hong Kong time
-    HK_TZ = timezone(timedelta(hours=8))
-    now_str = datetime.now(HK_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    now_str = datetime.now(_HK_TZ).strftime("%Y-%m-%d %H:%M:%S")
     
-    data = {"content": f"[{now_str}] {message}"}
+    _ALERT_BUF.append(f"[{now_str}] {message}")
+
+def _chunk_alerts(messages, limit: int = ALERT_CHUNK_SIZE):
+    """
+    Pack messages into newline-joined chunks of at most `limit` characters.
+    A single message longer than `limit` is split across chunks.
+    """
+    chunks = []
+    current = ""
+    for message in messages:
+        for i in range(0, len(message), limit):
+            piece = message[i:i + limit]
+            if current and len(current) + 1 + len(piece) > limit:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def flush_alerts():
+    """Send all queued alerts to Discord, one POST per chunk."""
+    if not _ALERT_BUF:
+        return
+    messages = list(_ALERT_BUF)
+    _ALERT_BUF.clear()
+    for chunk in _chunk_alerts(messages):
+        data = {"content": chunk}
+        try:
+            _session().post(DISCORD_WEBHOOK_URL, json=data, timeout=5)
+        except Exception as e:
+            print(f"[Error] Failed to send alert to Discord: {e}")
+
+atexit.register(flush_alerts)
+
+UPTIME_COMMAND = "cat /proc/uptime"
+CPU_TEMP_COMMAND = "sensors | grep 'Package id 0:' | awk '{print $4}'"
+GPU_TEMP_COMMAND = "nvidia-smi --query-gpu=temperature.gpu --format=csv,noheader,nounits"
+GPU_APPS_COMMAND = "nvidia-smi --query-compute-apps=pid,process_name,used_gpu_memory --format=csv,noheader,nounits"
+
+def _read_local_uptime() -> str:
+    """Read /proc/uptime directly; same output as UPTIME_COMMAND."""
+    with open("/proc/uptime") as f:
+        return f.read().strip()
+
+def _read_local_cpu_temp():
+    """
+    Read the 'Package id 0' temperature from the coretemp hwmon device,
+    formatted like sensors ('+45.0°C'). Returns None if it can't be found.
+    """
+    for label_path in glob.glob("/sys/class/hwmon/hwmon*/temp*_label"):
+        try:
+            with open(label_path) as f:
+                if f.read().strip() != "Package id 0":
+                    continue
+            with open(label_path[:-len("_label")] + "_input") as f:
+                return f"+{int(f.read().strip()) / 1000:.1f}°C"
+        except (OSError, ValueError):
+            continue
+    return None
+
+def _run_local_cpu_temp() -> str:
+    """
+    CPU_TEMP_COMMAND without a shell: read sysfs, falling back to parsing
+    `sensors` output in Python. Returns "" if neither has the reading;
+    a `sensors` timeout is raised like any other probe timeout.
+    """
+    cpu_temp = _read_local_cpu_temp()
+    if cpu_temp is not None:
+        return cpu_temp
     try:
-        requests.post(DISCORD_WEBHOOK_URL, json=data, timeout=5)
-    except Exception as e:
-        print(f"[Error] Failed to send alert to Discord: {e}")
+        sensors_str = run_local_command(["sensors"])
+    except subprocess.TimeoutExpired:
+        raise
+    except:
+        return ""
+    for line in sensors_str.split('\n'):
+        if line.startswith("Package id 0:"):
+            fields = line.split()
+            if len(fields) > 3:
+                return fields[3]
+    return ""
 
-def run_local_command(command: str) -> str:
+def run_local_command(argv: list[str]) -> str:
     """
-    Runs a shell command locally using subprocess.
+    Runs a command locally using subprocess, without a shell.
     Returns stdout as a string.
-    Raises an exception on failure.
+    Raises an exception on failure, or if it runs longer than
+    config.COMMAND_TIMEOUT seconds.
     """
-    result = subprocess.run(
-        command,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=True
-    )
+    try:
+        result = subprocess.run(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+            timeout=config.COMMAND_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        print(f"[Error] Local command timed out after {config.COMMAND_TIMEOUT}s: {argv}")
+        raise
     return result.stdout.strip()
 
-def run_ssh_command(server_addr: str, command: str) -> str:
+def _run_on_current_server(command: str) -> str:
     """
-    Runs a command on a remote server via SSH, returns stdout as a string.
+    Run a command on the current server, reading /proc and /sys directly
+    for known probes.
     """
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    try:
-        keypath = config.SSH_KEY_PATH
-        if keypath and os.path.isfile(os.path.expanduser(keypath)):
-            client.connect(
-                hostname=server_addr,
-                username=config.SSH_USERNAME,
-                key_filename=os.path.expanduser(keypath),
-                look_for_keys=False,
-                timeout=5
-            )
-        else:
-            client.connect(
-                hostname=server_addr,
-                username=config.SSH_USERNAME,
-                # password=SSH_PASSWORD,
-                timeout=5
-            )
-        stdin, stdout, stderr = client.exec_command(command)
-        output = stdout.read().decode("utf-8").strip()
-        return output
-    finally:
-        client.close()
+    local_probe = _LOCAL_PROBES.get(command)
+    if local_probe is not None:
+        return local_probe()
+    return run_local_command(shlex.split(command))
+
+# Command runner for each configured server, chosen once at import:
+# local for config.CURRENT_SERVER_NAME, SSH to its address otherwise
+_RUNNERS = {
+    server["name"]: functools.partial(run_ssh_command, server["address"])
+    for server in config.SERVERS
+}
+_RUNNERS[config.CURRENT_SERVER_NAME] = _run_on_current_server
 
 def run_command(server_name: str, server_addr: str, command: str) -> str:
     """
-    Decide whether to run a local command (if server_name == config.CURRENT_SERVER_NAME)
-    or run an SSH command (otherwise).
+    Run a command locally (if server_name == config.CURRENT_SERVER_NAME)
+    or via SSH (otherwise). Servers missing from config.SERVERS are reached
+    over SSH at server_addr.
     """
-    if server_name == config.CURRENT_SERVER_NAME:
-        # Run locally
-        return run_local_command(command)
-    else:
-        # Run via SSH
+    runner = _RUNNERS.get(server_name)
+    if runner is None:
         return run_ssh_command(server_addr, command)
+    return runner(command)
+
+def _run_on_current_server_or_timeout(command: str):
+    """_run_on_current_server, returning None if the command timed out."""
+    try:
+        return _run_on_current_server(command)
+    except subprocess.TimeoutExpired:
+        return None
+
+def _run_many_on_current_server(commands: list[str]) -> list[str | None]:
+    """Run commands on the current server one after another."""
+    return [_run_on_current_server_or_timeout(command) for command in commands]
+
+# Same as _RUNNERS, for run_commands
+_BATCH_RUNNERS = {
+    server["name"]: functools.partial(run_ssh_commands, server["address"])
+    for server in config.SERVERS
+}
+_BATCH_RUNNERS[config.CURRENT_SERVER_NAME] = _run_many_on_current_server
+
+def run_commands(server_name: str, server_addr: str, commands: list[str]) -> list[str | None]:
+    """
+    Like run_command, for several commands. Over SSH they run concurrently
+    on one connection; locally they run one after another.
+    A command that times out gets None instead of its output.
+    """
+    runner = _BATCH_RUNNERS.get(server_name)
+    if runner is None:
+        return run_ssh_commands(server_addr, commands)
+    return runner(commands)
 
 def is_server_reachable(name: str, address: str) -> bool:
     """
-    Check if a server is reachable by attempting to run 'uptime'.
+    Check if a server is reachable. The current server runs 'uptime' locally;
+    remote servers only need to accept a TCP connection on the SSH port, so
+    no key exchange or authentication is done.
     """
-    try:
-        _ = run_command(name, address, "uptime")
-        return True
-    except:
-        return False
+    if name == config.CURRENT_SERVER_NAME:
+        try:
+            _ = run_local_command(["uptime"])
+            return True
+        except:
+            return False
+    return is_reachable(name, address)
+
+# Parsers for probe output
+_TEMP_RE = re.compile(r"[+-]?\d+(?:\.\d+)?")
+# nvidia-smi temperature.gpu rows: one bare number per line, so error lines
+# such as "Unable to determine the device handle for GPU0000:98:00.0" are skipped
+_GPU_TEMP_RE = re.compile(r"^[ \t]*(\d+(?:\.\d+)?)[ \t]*$", re.M)
+# nvidia-smi compute-apps rows: pid, process_name, used_gpu_memory
+_GPU_PROC_RE = re.compile(r"^[ \t]*(\d+)[ \t]*,[ \t]*([^,\n]+?)[ \t]*,[ \t]*([^,\n]+?)[ \t]*$", re.M)
+# GPU_PROBE rows, with the owner resolved on the server: pid, user, process_name, used_gpu_memory
+_GPU_PROC_USER_RE = re.compile(
+    r"^[ \t]*(\d+)[ \t]*,[ \t]*([^,\n]*?)[ \t]*,[ \t]*([^,\n]+?)[ \t]*,[ \t]*([^,\n]+?)[ \t]*$", re.M
+)
+# `ps -o pid=,user=` rows
+_PS_USER_RE = re.compile(r"^[ \t]*(\d+)[ \t]+(\S+)[ \t]*$", re.M)
+
+def _parse_cpu_temp(cpu_temp_str: str) -> float:
+    """Parse the 'Package id 0' reading from sensors, e.g. '+45.0°C'."""
+    match = _TEMP_RE.search(cpu_temp_str)
+    if match is None:
+        raise ValueError(f"no temperature in {cpu_temp_str!r}")
+    return float(match.group())
+
+def _parse_gpu_temp(gpu_temp_str: str) -> float:
+    """Return the hottest GPU temperature from nvidia-smi output (0.0 if none)."""
+    gpu_temps = [float(x) for x in _GPU_TEMP_RE.findall(gpu_temp_str)]
+    return max(gpu_temps) if gpu_temps else 0.0
 
 def get_gpu_processes(name: str, address: str):
     """
@@ -158,89 +325,186 @@ def get_gpu_processes(name: str, address: str):
         },
         ...
       ]
+    Errors give an empty list, but a local subprocess.TimeoutExpired is raised.
     """
     results = []
     try:
         processes_str = run_command(
             name, 
             address, 
-            "nvidia-smi --query-compute-apps=pid,process_name,used_gpu_memory --format=csv,noheader,nounits"
+            GPU_APPS_COMMAND
         )
-        lines = [line.strip() for line in processes_str.split('\n') if line.strip()]
-        for line in lines:
-            parts = [p.strip() for p in line.split(',')]
-            if len(parts) < 3:
-                continue
-            pid_str, proc_name, gpu_mem_str = parts
-
-            # Get username for this PID
-            username = "unknown"
+        rows = [match.groups() for match in _GPU_PROC_RE.finditer(processes_str)]
+
+        # Get usernames for all PIDs in one call
+        usernames = {}
+        pids = [parts[0] for parts in rows]
+        if pids:
             try:
-                user_str = run_command(name, address, f"ps -o user= -p {pid_str}")
-                if user_str:
-                    username = user_str.strip()
+                user_str = run_command(name, address, f"ps -o pid=,user= -p {','.join(pids)}")
+                usernames = dict(_PS_USER_RE.findall(user_str))
+            except subprocess.TimeoutExpired:
+                raise
             except:
                 pass
 
+        for pid_str, proc_name, gpu_mem_str in rows:
             results.append({
                 "pid": pid_str,
-                "username": username,
+                "username": usernames.get(pid_str, "unknown"),
                 "process_name": proc_name,
                 "gpu_mem_mb": gpu_mem_str
             })
+    except subprocess.TimeoutExpired:
+        raise
     except:
         pass
     return results
 
-def get_temperatures(name: str, address: str) -> dict:
+# Per-server probes, sent as two concurrent commands on one connection. Each
+# section is introduced by an ===X=== marker line; GPU process usernames are
+# resolved on the server.
+# nvidia-smi is slow to start, so the GPU part is skipped on CPU-only servers.
+BASE_PROBE = (
+    f"echo ===UP===; {UPTIME_COMMAND}; "
+    f"echo ===CPU===; {CPU_TEMP_COMMAND}; "
+)
+GPU_PROBE = (
+    f"echo ===GPU===; {GPU_TEMP_COMMAND}; "
+    "echo ===PROCS===; "
+    f"{GPU_APPS_COMMAND}"
+    " | while IFS=, read pid rest; do"
+    " u=$(ps -o user= -p $pid 2>/dev/null); echo \"$pid,$u,$rest\"; done"
+)
+
+def _run_local_base_probe() -> str:
+    """BASE_PROBE output for the current server, built without a shell."""
+    return f"===UP===\n{_read_local_uptime()}\n===CPU===\n{_run_local_cpu_temp()}"
+
+def _run_local_gpu_probe() -> str:
+    """GPU_PROBE output for the current server, built without a shell."""
+    try:
+        gpu_temp_str = run_local_command(shlex.split(GPU_TEMP_COMMAND))
+    except subprocess.TimeoutExpired:
+        raise
+    except:
+        gpu_temp_str = ""
+    gpu_procs = get_gpu_processes(config.CURRENT_SERVER_NAME, config.CURRENT_SERVER_NAME)
+    procs_str = "\n".join(
+        f"{proc['pid']},{proc['username']},{proc['process_name']},{proc['gpu_mem_mb']}"
+        for proc in gpu_procs
+    )
+    return f"===GPU===\n{gpu_temp_str}\n===PROCS===\n{procs_str}"
+
+# Commands that run_command answers in Python on the current server
+_LOCAL_PROBES = {
+    BASE_PROBE: _run_local_base_probe,
+    GPU_PROBE: _run_local_gpu_probe,
+}
+
+def _split_probe_output(output: str) -> dict:
+    """Split BASE_PROBE/GPU_PROBE output into {marker: section text}."""
+    sections = {}
+    current = None
+    for line in output.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith("===") and stripped.endswith("===") and len(stripped) > 6:
+            current = stripped[3:-3]
+            sections[current] = []
+        elif current is not None:
+            sections[current].append(line)
+    return {key: "\n".join(lines).strip() for key, lines in sections.items()}
+
+def probe_server(name: str, address: str, has_gpu: bool = True) -> dict:
     """
-    Retrieve CPU and GPU temperatures from the server.
+    Run all probes on the server in a single round-trip and return:
+      {
+        "reachable": <bool>,
+        "temps": {"cpu": <float>, "gpu": <float>},
+        "gpu_procs": [<same dicts as get_gpu_processes>],
+        "uptime": <seconds>,
+        "timed_out": [<"system" and/or "GPU", for probes that timed out>],
+        "ssh_error": <str, if the server is up but the probe command failed>
+      }
+    A server that is up but whose probes time out or fail to run (e.g. its
+    host key isn't in known_hosts) is still reachable.
     """
-    temperatures = {"cpu": 0.0, "gpu": 0.0}
-    # CPU
+    result = {
+        "reachable": False,
+        "temps": {"cpu": 0.0, "gpu": 0.0},
+        "gpu_procs": [],
+        "uptime": 0.0,
+        "timed_out": [],
+        "ssh_error": None,
+    }
+    # Only pay for an SSH session on servers that are confirmed up
+    if not is_server_reachable(name, address):
+        return result
+    # The base and GPU probes run side by side so sensors and nvidia-smi overlap
+    probes = {"system": BASE_PROBE, "GPU": GPU_PROBE} if has_gpu else {"system": BASE_PROBE}
+    try:
+        outputs = run_commands(name, address, list(probes.values()))
+    except Exception as e:
+        print(f"[Error] SSH probe failed for {name}: {e}")
+        result["reachable"] = True
+        result["ssh_error"] = str(e) or type(e).__name__
+        return result
+    result["reachable"] = True
+    for label, probe_output in zip(probes, outputs):
+        if probe_output is None:
+            print(f"[Error] {label} probe timed out on {name} after {config.COMMAND_TIMEOUT}s")
+            result["timed_out"].append(label)
+    sections = _split_probe_output("\n".join(o for o in outputs if o is not None))
+
+    if "system" not in result["timed_out"]:
+        try:
+            result["uptime"] = float(sections.get("UP", "").split()[0])
+        except Exception as e:
+            print(f"[Error] Failed to get uptime for {name}: {e}")
+
     try:
-        cpu_temp_str = run_command(name, address, "sensors | grep 'Package id 0:' | awk '{print $4}'")
-        if cpu_temp_str.startswith('+'):
-            cpu_temp_str = cpu_temp_str[1:]
-        temperatures["cpu"] = float(cpu_temp_str.replace('°C', '').strip())
+        result["temps"]["cpu"] = _parse_cpu_temp(sections.get("CPU", ""))
     except:
         pass
 
-    # GPU
     try:
-        gpu_temp_str = run_command(name, address, "nvidia-smi --query-gpu=temperature.gpu --format=csv,noheader,nounits")
-        gpu_temps = [float(x) for x in gpu_temp_str.split('\n') if x.strip()]
-        if gpu_temps:
-            temperatures["gpu"] = max(gpu_temps)
+        result["temps"]["gpu"] = _parse_gpu_temp(sections.get("GPU", ""))
     except:
         pass
 
-    return temperatures
+    for match in _GPU_PROC_USER_RE.finditer(sections.get("PROCS", "")):
+        pid_str, username, proc_name, gpu_mem_str = match.groups()
+        result["gpu_procs"].append({
+            "pid": pid_str,
+            "username": username or "unknown",
+            "process_name": proc_name,
+            "gpu_mem_mb": gpu_mem_str
+        })
 
-def get_system_uptime(name: str, address: str) -> float:
-    """Return the server's uptime in seconds."""
-    try:
-        output = run_command(name, address, "cat /proc/uptime")
-        return float(output.split()[0])
-    except Exception as e:
-        print(f"[Error] Failed to get uptime for {name}: {e}")
-        return 0.0
+    return result
 
 def monitor():
     """Check each server for temperature, unexpected reboots, and downtime."""
-    global last_uptime
-    last_uptime = load_last_uptime() 
-    down_since = load_down_since()
-    for server in config.SERVERS:
+    global last_uptime, down_since
+    if config.PERSIST_STATE:
+        last_uptime = load_last_uptime()
+        down_since = load_down_since()
+
+    def probe_one(server):
+        return probe_server(server["name"], server["address"], server.get("gpu", True))
+
+    # Probe all servers concurrently; alerting and state updates below stay
+    # serial so down_since/last_uptime are only touched from this thread.
+    with ThreadPoolExecutor(max_workers=max(1, len(config.SERVERS))) as ex:
+        results = list(ex.map(probe_one, config.SERVERS))
+
+    for server, probe in zip(config.SERVERS, results):
         server_name = server["name"]
-        server_addr = server["address"]
 
         # 1) Check if server is up
-        reachable = is_server_reachable(server_name, server_addr)
-        if not reachable:
+        if not probe["reachable"]:
             if server_name not in down_since:
                 down_since[server_name] = datetime.now().timestamp()
-                save_down_since(down_since)
                 send_discord_alert(f":x: **{server_name}** is down!")
             else:
                 # Calculate how long it's been down
@@ -254,10 +518,24 @@ def monitor():
                 down_time = datetime.now().timestamp() - down_since[server_name]
                 send_discord_alert(f":white_check_mark: **{server_name}** is back up after {int(down_time)} seconds!")
                 del down_since[server_name]
-                save_down_since(down_since)
+
+        # Up (TCP check passed) but the probe couldn't run, so nothing was measured
+        if probe["ssh_error"]:
+            send_discord_alert(
+                f":lock: **{server_name}** is up, but its SSH probe failed: {probe['ssh_error']}"
+            )
+            continue
+
+        # A hung probe (e.g. a stuck nvidia-smi) leaves the server up but unmeasured
+        if probe["timed_out"]:
+            probe_word = "probes" if len(probe["timed_out"]) > 1 else "probe"
+            send_discord_alert(
+                f":hourglass: **{server_name}** is up, but its {' and '.join(probe['timed_out'])} "
+                f"{probe_word} timed out after {config.COMMAND_TIMEOUT}s!"
+            )
                 
         # 2) Temperature checks
-        temps = get_temperatures(server_name, server_addr)
+        temps = probe["temps"]
         # CPU
         if temps["cpu"] > config.CPU_TEMP_THRESHOLD:
             send_discord_alert(
@@ -265,7 +543,7 @@ def monitor():
             )
         # GPU
         if temps["gpu"] > config.GPU_TEMP_THRESHOLD:
-            gpu_procs = get_gpu_processes(server_name, server_addr)
+            gpu_procs = probe["gpu_procs"]
             if not gpu_procs:
                 info_str = "No GPU processes found."
             else:
@@ -283,12 +561,21 @@ def monitor():
 
 
         # 3) Check for unexpected reboots (uptime)
-        current_uptime = get_system_uptime(server_name, server_addr)
+        if "system" in probe["timed_out"]:
+            # No uptime reading this cycle; keep the last one
+            continue
+        current_uptime = probe["uptime"]
         if server_name in last_uptime:
             if current_uptime + 300 < last_uptime[server_name]:  # If uptime is less, the server rebooted
                 send_discord_alert(f":warning: **{server_name}** rebooted unexpectedly!")
         last_uptime[server_name] = current_uptime
+
+    # Persist state once per cycle rather than after every server
+    if config.PERSIST_STATE:
+        save_down_since(down_since)
         save_last_uptime(last_uptime)
+
+    flush_alerts()
         
 def main_loop():
     # while True:
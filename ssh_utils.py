@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import atexit
+import functools
+import select
+import socket
+import time
+from typing import TYPE_CHECKING
+
+import config
+
+if TYPE_CHECKING:
+    import paramiko
+
+# paramiko pulls in cryptography and takes a few hundred ms to import; a cycle
+# that only needs TCP reachability checks never loads it.
+@functools.lru_cache(maxsize=None)
+def _paramiko():
+    import paramiko
+    return paramiko
+
+# If using password-based SSH instead of a key, set config.SSH_KEY_PATH = None in config.py.
+# SSH_PASSWORD = None  # e.g. "your-ssh-password" if not using key-based auth
+
+# Live SSH connections keyed by server address, reused across commands
+_SSH_POOL: dict[str, paramiko.SSHClient] = {}
+
+KNOWN_HOSTS_FILE = os.path.expanduser("~/.ssh/known_hosts")
+
+@functools.lru_cache(maxsize=None)
+def _host_keys() -> paramiko.HostKeys:
+    """Known host keys, parsed once and shared by every SSH connection."""
+    host_keys = _paramiko().HostKeys()
+    if os.path.isfile(KNOWN_HOSTS_FILE):
+        host_keys.load(KNOWN_HOSTS_FILE)
+    return host_keys
+
+# SSH key path from config, resolved once
+_RESOLVED_KEY = os.path.expanduser(config.SSH_KEY_PATH) if config.SSH_KEY_PATH else None
+_KEY_EXISTS = bool(_RESOLVED_KEY) and os.path.isfile(_RESOLVED_KEY)
+
+def _connect_ssh(server_addr: str) -> paramiko.SSHClient:
+    """
+    Open a new SSH connection to the server and store it in the pool.
+    """
+    paramiko = _paramiko()
+    client = paramiko.SSHClient()
+    client._host_keys = _host_keys()
+    client.set_missing_host_key_policy(paramiko.RejectPolicy())
+    try:
+        if _KEY_EXISTS:
+            client.connect(
+                hostname=server_addr,
+                username=config.SSH_USERNAME,
+                key_filename=_RESOLVED_KEY,
+                look_for_keys=False,
+                timeout=5
+            )
+        else:
+            client.connect(
+                hostname=server_addr,
+                username=config.SSH_USERNAME,
+                # password=SSH_PASSWORD,
+                timeout=5
+            )
+    except:
+        client.close()
+        raise
+    _SSH_POOL[server_addr] = client
+    return client
+
+def _get_ssh_client(server_addr: str) -> paramiko.SSHClient:
+    """
+    Return the pooled SSH connection for the server, reconnecting if it is
+    missing or no longer active.
+    """
+    client = _SSH_POOL.get(server_addr)
+    if client is not None:
+        transport = client.get_transport()
+        if transport is not None and transport.is_active():
+            return client
+        _drop_ssh_client(server_addr)
+    return _connect_ssh(server_addr)
+
+def _drop_ssh_client(server_addr: str):
+    """Close and forget the pooled SSH connection for the server, if any."""
+    client = _SSH_POOL.pop(server_addr, None)
+    if client is not None:
+        try:
+            client.close()
+        except:
+            pass
+
+def close_ssh_pool():
+    """Close every pooled SSH connection."""
+    for server_addr in list(_SSH_POOL):
+        _drop_ssh_client(server_addr)
+
+atexit.register(close_ssh_pool)
+
+def _exec_ssh_commands(client: paramiko.SSHClient, commands: list[str]) -> list[str | None]:
+    """
+    Run all commands at once, each on its own channel of the client's
+    transport, and return their stdout in the same order.
+    A command that hasn't finished within config.COMMAND_TIMEOUT seconds
+    gets None, so one stalled command doesn't discard the others' output.
+    """
+    transport = client.get_transport()
+    if transport is None:
+        raise _paramiko().SSHException("SSH transport is not connected")
+    deadline = time.monotonic() + config.COMMAND_TIMEOUT
+    channels = []
+    try:
+        for command in commands:
+            channel = transport.open_session()
+            channel.settimeout(config.COMMAND_TIMEOUT)
+            channel.exec_command(command)
+            channels.append(channel)
+
+        outputs = [[] for _ in channels]
+        pending = list(channels)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select(pending, [], [], remaining)
+            for channel in readable:
+                # Drain stderr so a chatty command can't stall its channel
+                while channel.recv_stderr_ready():
+                    channel.recv_stderr(32768)
+                if channel.recv_ready():
+                    outputs[channels.index(channel)].append(channel.recv(32768))
+                elif channel.eof_received:
+                    pending.remove(channel)
+                elif channel.closed:
+                    # Closed without EOF: the connection dropped mid-read
+                    raise EOFError("SSH channel closed before the command finished")
+        return [
+            None if channel in pending else b"".join(chunks).decode("utf-8").strip()
+            for channel, chunks in zip(channels, outputs)
+        ]
+    finally:
+        for channel in channels:
+            channel.close()
+
+def run_ssh_commands(server_addr: str, commands: list[str]) -> list[str | None]:
+    """
+    Runs several commands concurrently on a remote server over one pooled SSH
+    connection, returns each command's stdout as a string (None if it timed out).
+    If the pooled connection turns out to be dead, it is re-established once.
+    """
+    client = _get_ssh_client(server_addr)
+    try:
+        return _exec_ssh_commands(client, commands)
+    except (_paramiko().SSHException, EOFError):
+        _drop_ssh_client(server_addr)
+        client = _get_ssh_client(server_addr)
+        return _exec_ssh_commands(client, commands)
+
+def run_ssh_command(server_addr: str, command: str) -> str:
+    """
+    Runs a command on a remote server via SSH, returns stdout as a string.
+    The connection is kept open in the pool and reused by later calls.
+    Raises socket.timeout if it runs longer than config.COMMAND_TIMEOUT seconds.
+    """
+    output = run_ssh_commands(server_addr, [command])[0]
+    if output is None:
+        raise socket.timeout(f"command timed out after {config.COMMAND_TIMEOUT}s")
+    return output
+
+def is_reachable(name: str, address: str) -> bool:
+    """
+    Check if a server is reachable: it only needs to accept a TCP connection
+    on the SSH port, so no key exchange or authentication is done.
+    """
+    try:
+        s = socket.create_connection((address, 22), timeout=2)
+        s.close()
+        return True
+    except OSError:
+        return False